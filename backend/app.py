@@ -5,13 +5,18 @@ from flask_jwt_extended import JWTManager, create_access_token, get_jwt_identity
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.sql import text
 from sqlalchemy.dialects.postgresql import ARRAY
-from sqlalchemy import extract, func
+from sqlalchemy import delete, extract, func, select, update
 import bcrypt
+import hashlib
+import json
 import os
-from datetime import timedelta
+import time
+import threading
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import re
 import requests
+from requests.adapters import HTTPAdapter
 from decimal import Decimal
 from huggingface_hub import InferenceClient
 
@@ -19,13 +24,22 @@ from huggingface_hub import InferenceClient
 load_dotenv()
 
 resend_api_key = os.getenv('RESEND_API_KEY')
+# Base URL of the Resend API (override to point at a local mock server)
+RESEND_API_URL = os.getenv('RESEND_API_URL', 'https://api.resend.com').rstrip('/')
+
+# Third-party feeds proxied for the dashboard widgets (URLs can point at local fixture servers)
+EXCHANGE_API_KEY = os.getenv('EXCHANGE_API_KEY')
+EXCHANGE_API_URL = os.getenv('EXCHANGE_API_URL', 'https://v6.exchangerate-api.com/v6').rstrip('/')
+NEWS_API_TOKEN = os.getenv('NEWS_API_TOKEN')
+NEWS_API_URL = os.getenv('NEWS_API_URL', 'https://api.marketaux.com/v1').rstrip('/')
 
 app = Flask(__name__)
 CORS(app)
 
 #HUGGINGFACE_API_KEY SETUP
 HF_API_KEY = os.getenv("HUGGINGFACE_API_KEY")
-client = InferenceClient(api_key=HF_API_KEY)
+HF_BASE_URL = os.getenv("HUGGINGFACE_BASE_URL")  # Optional, e.g. a local stub model for load tests
+client = InferenceClient(api_key=HF_API_KEY, base_url=HF_BASE_URL)
 
 # Setup the Flask-JWT-Extended extension
 app.config["JWT_SECRET_KEY"] = os.getenv("JWT_SECRET_KEY")
@@ -102,6 +116,24 @@ class Customer(db.Model):
     customersegment = db.Column(db.String(50), nullable=True)
     riskrating = db.Column(db.Numeric(5, 2), nullable=True)
 
+class EmailOutbox(db.Model):
+    __tablename__ = 'email_outbox'
+
+    id = db.Column(db.Integer, primary_key=True)
+    recipients = db.Column(ARRAY(db.String), nullable=False)  # List of "to" addresses
+    subject = db.Column(db.String(255), nullable=False)
+    html = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default="Pending", index=True)  # Pending/Sending/Sent/Dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    last_error = db.Column(db.Text, nullable=True)
+    provider_id = db.Column(db.String(100), nullable=True)  # Id returned by Resend
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<EmailOutbox(id={self.id}, status={self.status}, attempts={self.attempts})>"
+
 # Route to generate insights
 @app.route('/generate-insights', methods=['POST'])
 def generate_insights():
@@ -321,30 +353,346 @@ def delete_user(email):
 
     return jsonify({"message": "User deleted successfully"}), 200
 
+def get_bulk_emails(data):
+    emails = data.get('emails')
+    if not isinstance(emails, list) or not emails or not all(isinstance(e, str) for e in emails):
+        return None
+    # Drop duplicates but keep the caller's order for the results
+    return list(dict.fromkeys(emails))
+
+
+def bulk_results(emails, done, done_status):
+    return [{"email": email, "status": done_status if email in done else "not_found"} for email in emails]
+
+
+# Update the role of several users in one transaction
+@app.route('/api/users/bulk/role', methods=['PUT'])
+def bulk_update_user_role():
+    data = request.get_json() or {}
+    emails = get_bulk_emails(data)
+    if not emails:
+        return jsonify({"error": "A non-empty list of emails is required"}), 400
+
+    new_role = data.get('role')
+    if not isinstance(new_role, str) or not new_role:
+        return jsonify({"error": "New role is required"}), 400
+
+    try:
+        # One UPDATE on the unique email index; RETURNING tells us which users exist
+        updated = set(db.session.execute(
+            update(User).where(User.email.in_(emails)).values(role=new_role).returning(User.email)
+        ).scalars())
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in bulk role update: {e}")
+        return jsonify({"error": "Failed to update roles"}), 500
+
+    return jsonify({"updated": len(updated), "results": bulk_results(emails, updated, "updated")}), 200
+
+
+# Update the full name of several users in one transaction
+@app.route('/api/users/bulk/name', methods=['PUT'])
+def bulk_update_user_name():
+    data = request.get_json() or {}
+    users = data.get('users')
+    if not isinstance(users, list) or not users:
+        return jsonify({"error": "A non-empty list of users is required"}), 400
+
+    # Later entries win if an email is listed twice
+    new_names = {}
+    entries = []  # (email, valid) in the caller's order
+    for entry in users:
+        email = entry.get('email') if isinstance(entry, dict) else None
+        full_name = entry.get('fullName') if isinstance(entry, dict) else None
+        if isinstance(email, str) and email and isinstance(full_name, str) and full_name:
+            new_names[email] = full_name
+            entries.append((email, True))
+        else:
+            entries.append((email if isinstance(email, str) else None, False))
+
+    updated = set()
+    if new_names:
+        try:
+            updated = set(db.session.execute(
+                update(User).where(User.email.in_(list(new_names))).values(
+                    full_name=db.case(new_names, value=User.email)
+                ).returning(User.email)
+            ).scalars())
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error in bulk name update: {e}")
+            return jsonify({"error": "Failed to update names"}), 500
+
+    # One result per entry, in the caller's order
+    results = []
+    reported = set()
+    for email, valid in entries:
+        if not valid:
+            results.append({"email": email, "status": "invalid"})
+        elif email not in reported:
+            reported.add(email)
+            results.append({"email": email, "status": "updated" if email in updated else "not_found"})
+    return jsonify({"updated": len(updated), "results": results}), 200
+
+
+# Delete several users in one transaction
+@app.route('/api/users/bulk/delete', methods=['POST'])
+def bulk_delete_users():
+    data = request.get_json() or {}
+    emails = get_bulk_emails(data)
+    if not emails:
+        return jsonify({"error": "A non-empty list of emails is required"}), 400
+
+    try:
+        # Prevent deletion of admin users; the guard is part of the DELETE so a concurrent promotion is respected
+        deleted = set(db.session.execute(
+            delete(User).where(
+                User.email.in_(emails),
+                func.lower(func.coalesce(User.role, '')) != 'admin'
+            ).returning(User.email)
+        ).scalars())
+        # Whatever is left among the requested emails was protected
+        protected = set(db.session.execute(
+            select(User.email).where(User.email.in_([e for e in emails if e not in deleted]))
+        ).scalars())
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error in bulk delete: {e}")
+        return jsonify({"error": "Failed to delete users"}), 500
+
+    results = []
+    for email in emails:
+        if email in deleted:
+            status = "deleted"
+        elif email in protected:
+            status = "admin_protected"
+        else:
+            status = "not_found"
+        results.append({"email": email, "status": status})
+    return jsonify({"deleted": len(deleted), "results": results}), 200
+
 #Email service
-@app.route('/api/send-email', methods=['POST'])
-def send_email():
-    email_data = request.json
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {resend_api_key}'  # Use the API key from the environment variable
-    }
-    data = {
-        "from": "notification@dashboard-project-ay.site",
-        "to": email_data['to'],
-        "subject": email_data['subject'],
-        "html": email_data['html']
+EMAIL_FROM = "notification@dashboard-project-ay.site"
+EMAIL_BATCH_SIZE = 100  # Resend accepts at most 100 emails per batch call
+EMAIL_MAX_ATTEMPTS = int(os.getenv('EMAIL_MAX_ATTEMPTS', 6))
+EMAIL_BACKOFF_SECONDS = float(os.getenv('EMAIL_BACKOFF_SECONDS', 30))
+EMAIL_POLL_SECONDS = float(os.getenv('EMAIL_POLL_SECONDS', 5))
+# How long a claimed message stays "Sending" before another worker may retry it;
+# longer than a worst-case round of individual sends
+EMAIL_SEND_LEASE_SECONDS = float(os.getenv('EMAIL_SEND_LEASE_SECONDS', 1800))
+EMAIL_HTTP_TIMEOUT = (3.05, 10)  # (connect, read) timeouts in seconds
+
+# Keep-alive session shared by the dispatcher so connections to Resend are reused
+email_session = requests.Session()
+email_session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+email_session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=4))
+email_session.headers.update({
+    'Content-Type': 'application/json',
+    'Authorization': f'Bearer {resend_api_key}'
+})
+
+email_wakeup = threading.Event()
+email_dispatcher_lock = threading.Lock()
+email_dispatcher_thread = None
+
+
+class EmailDeliveryError(Exception):
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def email_payload(message):
+    return {
+        "from": EMAIL_FROM,
+        "to": message.recipients,
+        "subject": message.subject,
+        "html": message.html
     }
 
-    # Make the request to the Resend API
-    response = requests.post('https://api.resend.com/emails', json=data, headers=headers)
-    print(f"Resend response status: {response.status_code}")  # Log the response status
 
-    if response.status_code == 200:
-        return jsonify(response.json()), 200
+# Resend ignores a repeated Idempotency-Key, so a retry after an ambiguous failure
+# (e.g. a read timeout after the email was accepted) does not send duplicates
+def post_to_resend(path, payload, idempotency_key):
+    try:
+        response = email_session.post(
+            f"{RESEND_API_URL}{path}",
+            json=payload,
+            headers={'Idempotency-Key': idempotency_key},
+            timeout=EMAIL_HTTP_TIMEOUT
+        )
+    except requests.RequestException as e:
+        raise EmailDeliveryError(f"Request to Resend failed: {e}")
+
+    print(f"Resend response status: {response.status_code}")  # Log the response status
+    if 200 <= response.status_code < 300:
+        # The email was accepted even if the body can't be parsed; we only lose the provider id
+        try:
+            return response.json()
+        except ValueError:
+            print(f"Unparseable Resend response body: {response.text[:200]}")
+            return {}
+
+    # Timeouts, rate limiting and server errors are worth retrying; other client errors are not
+    retryable = response.status_code in (408, 429) or response.status_code >= 500
+    raise EmailDeliveryError(f"{response.status_code}: {response.text}", retryable=retryable)
+
+
+def mark_email_failed(message, error, now):
+    message.attempts += 1
+    message.last_error = str(error)
+    if not error.retryable or message.attempts >= EMAIL_MAX_ATTEMPTS:
+        message.status = "Dead"
+        print(f"Email {message.id} dead-lettered after {message.attempts} attempt(s): {error}")
     else:
-        print(f"Error sending email: {response.text}")  # Log the error
-        return jsonify({"error": "Failed to send email"}), response.status_code
+        # Exponential backoff: base, 2*base, 4*base, ...
+        message.status = "Pending"
+        message.next_attempt_at = now + timedelta(seconds=EMAIL_BACKOFF_SECONDS * 2 ** (message.attempts - 1))
+        print(f"Email {message.id} failed (attempt {message.attempts}), retrying at {message.next_attempt_at}: {error}")
+
+
+def mark_email_sent(message, provider_id, now):
+    message.attempts += 1
+    message.status = "Sent"
+    message.sent_at = now
+    message.provider_id = provider_id
+    message.last_error = None
+
+
+def response_id(result):
+    return result.get('id') if isinstance(result, dict) else None
+
+
+# Send each claimed email on its own; returns {id: (provider_id, error)}
+def deliver_individually(claimed):
+    outcomes = {}
+    for message_id, payload in claimed:
+        try:
+            outcomes[message_id] = (response_id(post_to_resend('/emails', payload, f"email-outbox-{message_id}")), None)
+        except EmailDeliveryError as e:
+            outcomes[message_id] = (None, e)
+        except Exception as e:
+            outcomes[message_id] = (None, EmailDeliveryError(f"Unexpected error: {e}"))
+    return outcomes
+
+
+def deliver_batch(claimed):
+    try:
+        # Key the batch on its members so a retry of the same set is deduplicated
+        batch_ids = ','.join(str(message_id) for message_id, _ in sorted(claimed, key=lambda c: c[0]))
+        batch_key = f"email-outbox-batch-{hashlib.sha1(batch_ids.encode('utf-8')).hexdigest()}"
+        result = post_to_resend('/emails/batch', [payload for _, payload in claimed], batch_key)
+    except EmailDeliveryError as e:
+        if e.retryable:
+            return {message_id: (None, e) for message_id, _ in claimed}
+        # The batch was rejected as a whole; send one by one so only the bad message is dead-lettered
+        print(f"Batch rejected, falling back to individual delivery: {e}")
+        return deliver_individually(claimed)
+    except Exception as e:
+        error = EmailDeliveryError(f"Unexpected error: {e}")
+        return {message_id: (None, error) for message_id, _ in claimed}
+
+    items = result.get('data') if isinstance(result, dict) else None
+    ids = [response_id(item) for item in items] if isinstance(items, list) else []
+    ids += [None] * (len(claimed) - len(ids))
+    return {message_id: (provider_id, None) for (message_id, _), provider_id in zip(claimed, ids)}
+
+
+# Send one round of due outbox messages; returns the number of messages processed
+def dispatch_pending_emails():
+    now = datetime.utcnow()
+    # Claim due messages (and "Sending" ones whose lease ran out after a crash) in a short transaction.
+    # SKIP LOCKED lets several workers drain the outbox without claiming the same message twice.
+    messages = EmailOutbox.query.filter(
+        EmailOutbox.status.in_(["Pending", "Sending"]),
+        EmailOutbox.next_attempt_at <= now
+    ).order_by(
+        EmailOutbox.next_attempt_at, EmailOutbox.id
+    ).limit(EMAIL_BATCH_SIZE).with_for_update(skip_locked=True).all()
+
+    claimed = []
+    for message in messages:
+        message.status = "Sending"
+        message.next_attempt_at = now + timedelta(seconds=EMAIL_SEND_LEASE_SECONDS)
+        claimed.append((message.id, email_payload(message)))
+    db.session.commit()
+
+    if not claimed:
+        return 0
+
+    # Talk to Resend outside of any transaction
+    outcomes = deliver_individually(claimed) if len(claimed) == 1 else deliver_batch(claimed)
+
+    # Record the results in a second short transaction
+    now = datetime.utcnow()
+    for message in EmailOutbox.query.filter(
+        EmailOutbox.id.in_(list(outcomes)),
+        EmailOutbox.status == "Sending"
+    ).all():
+        provider_id, error = outcomes[message.id]
+        if error is None:
+            mark_email_sent(message, provider_id, now)
+        else:
+            mark_email_failed(message, error, now)
+    db.session.commit()
+    return len(claimed)
+
+
+def run_email_dispatcher():
+    while True:
+        try:
+            with app.app_context():
+                # Keep draining while full batches are coming back
+                while dispatch_pending_emails() >= EMAIL_BATCH_SIZE:
+                    pass
+        except Exception as e:
+            print(f"Error in email dispatcher: {e}")
+            with app.app_context():
+                db.session.rollback()
+        email_wakeup.wait(EMAIL_POLL_SECONDS)
+        email_wakeup.clear()
+
+
+def start_email_dispatcher():
+    global email_dispatcher_thread
+    with email_dispatcher_lock:
+        if email_dispatcher_thread is None or not email_dispatcher_thread.is_alive():
+            email_dispatcher_thread = threading.Thread(target=run_email_dispatcher, name="email-dispatcher", daemon=True)
+            email_dispatcher_thread.start()
+
+
+# Start delivering at startup so messages left in the outbox by a restart or crash are sent
+start_email_dispatcher()
+
+
+@app.route('/api/send-email', methods=['POST'])
+def send_email():
+    email_data = request.get_json() or {}
+    recipients = email_data.get('to')
+    subject = email_data.get('subject')
+    html = email_data.get('html')
+
+    if not recipients or not subject or not html:
+        return jsonify({"error": "to, subject and html are required"}), 400
+    if isinstance(recipients, str):
+        recipients = [recipients]
+    if not isinstance(recipients, list) or not all(isinstance(r, str) and r for r in recipients):
+        return jsonify({"error": "to must be an email address or a list of email addresses"}), 400
+    if not isinstance(subject, str) or not isinstance(html, str):
+        return jsonify({"error": "subject and html must be strings"}), 400
+
+    # Queue the email; the background dispatcher delivers it
+    message = EmailOutbox(recipients=recipients, subject=subject, html=html)
+    db.session.add(message)
+    db.session.commit()
+
+    start_email_dispatcher()
+    email_wakeup.set()
+
+    return jsonify({"message": "Email queued", "id": message.id}), 202
 
 from sqlalchemy.sql import text
 
@@ -677,5 +1025,424 @@ def get_churn_rate_data():
         print(f"Error in get-churn-rate-data: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+TRANSACTION_CHANNEL_KEYS = {"Online": "online", "Debit Card": "debitCard", "Credit Card": "creditCard", "ATM": "atm"}
+
+
+def to_number(value):
+    return float(value) if isinstance(value, Decimal) else (value or 0)
+
+
+# Absolute and percent change of current vs prior, element by element
+def comparison_deltas(current, prior):
+    delta = [c - p for c, p in zip(current, prior)]
+    delta_pct = [round((c - p) / p * 100, 2) if p else None for c, p in zip(current, prior)]
+    return delta, delta_pct
+
+
+def get_comparison_years():
+    year = request.args.get('year', type=int)
+    if not year:
+        return None, None
+    compare_year = request.args.get('compare_year', year - 1, type=int)
+    return year, compare_year
+
+
+@app.route('/api/compare-transaction-data', methods=['GET'])
+def compare_transaction_data():
+    year, compare_year = get_comparison_years()
+    if not year:
+        return jsonify({"error": "Year parameter is missing"}), 400
+    if compare_year >= year:
+        return jsonify({"error": "compare_year must be earlier than year"}), 400
+
+    try:
+        # Monthly totals per channel for both years
+        monthly = db.session.query(
+            extract('year', Transaction.transactiondate).label('year'),
+            extract('month', Transaction.transactiondate).label('month'),
+            Transaction.channel,
+            func.sum(Transaction.transactionamount).label('total_amount')
+        ).filter(
+            extract('year', Transaction.transactiondate).in_([year, compare_year])
+        ).group_by(
+            extract('year', Transaction.transactiondate),
+            extract('month', Transaction.transactiondate),
+            Transaction.channel
+        ).subquery()
+
+        # Same month of the compare year via LAG, and year-to-date running totals
+        data = db.session.query(
+            monthly.c.year,
+            monthly.c.month,
+            monthly.c.channel,
+            monthly.c.total_amount,
+            func.lag(monthly.c.total_amount).over(
+                partition_by=(monthly.c.channel, monthly.c.month),
+                order_by=monthly.c.year
+            ).label('prior_amount'),
+            func.sum(monthly.c.total_amount).over(
+                partition_by=(monthly.c.channel, monthly.c.year),
+                order_by=monthly.c.month
+            ).label('running_total')
+        ).all()
+
+        if not data:
+            return jsonify({"error": "No data found for the given years"}), 404
+
+        current = {key: [0] * 12 for key in TRANSACTION_CHANNEL_KEYS.values()}
+        prior = {key: [0] * 12 for key in TRANSACTION_CHANNEL_KEYS.values()}
+        running = {key: [None] * 12 for key in TRANSACTION_CHANNEL_KEYS.values()}
+        prior_running = {key: [None] * 12 for key in TRANSACTION_CHANNEL_KEYS.values()}
+
+        for row in data:
+            key = TRANSACTION_CHANNEL_KEYS.get(row.channel)
+            if key is None:
+                print(f"Ignoring invalid channel: {row.channel}")
+                continue
+
+            index = int(row.month) - 1
+            if int(row.year) == year:
+                current[key][index] = to_number(row.total_amount)
+                prior[key][index] = to_number(row.prior_amount)
+                running[key][index] = to_number(row.running_total)
+            else:
+                # Also covers months that have no current-year row to LAG from
+                prior[key][index] = to_number(row.total_amount)
+                prior_running[key][index] = to_number(row.running_total)
+
+        result = {
+            "year": year,
+            "compareYear": compare_year,
+            "months": MONTH_NAMES,
+            "current": current,
+            "prior": prior,
+            "delta": {},
+            "deltaPct": {},
+            "runningTotal": running,
+            "priorRunningTotal": prior_running
+        }
+        for key in TRANSACTION_CHANNEL_KEYS.values():
+            result["delta"][key], result["deltaPct"][key] = comparison_deltas(current[key], prior[key])
+            # Months without transactions carry the running total forward
+            for totals in (running[key], prior_running[key]):
+                for i in range(12):
+                    if totals[i] is None:
+                        totals[i] = totals[i - 1] if i > 0 else 0
+
+        return jsonify(result)
+
+    except Exception as e:
+        print(f"Error in compare-transaction-data: {e}")
+        return jsonify({"error": "Failed to fetch transaction comparison data"}), 500
+
+
+@app.route('/api/compare-loan-data', methods=['GET'])
+def compare_loan_data():
+    year, compare_year = get_comparison_years()
+    if not year:
+        return jsonify({"error": "Year parameter is missing"}), 400
+    if compare_year >= year:
+        return jsonify({"error": "compare_year must be earlier than year"}), 400
+
+    try:
+        # Yearly totals per loan type up to the selected year
+        yearly = db.session.query(
+            extract('year', Loan.startdate).label('year'),
+            Loan.loantype,
+            func.count(Loan.loanid).label('loan_count'),
+            func.sum(Loan.loanamount).label('total_loan_amount')
+        ).filter(
+            extract('year', Loan.startdate) <= year
+        ).group_by(
+            extract('year', Loan.startdate),
+            Loan.loantype
+        ).subquery()
+
+        # Compare-year figures and cumulative amounts per loan type
+        compare_count = func.sum(db.case((yearly.c.year == compare_year, yearly.c.loan_count), else_=0))
+        compare_amount = func.sum(db.case((yearly.c.year == compare_year, yearly.c.total_loan_amount), else_=0))
+        windowed = db.session.query(
+            yearly.c.year,
+            yearly.c.loantype,
+            yearly.c.loan_count,
+            yearly.c.total_loan_amount,
+            compare_count.over(partition_by=yearly.c.loantype).label('prior_count'),
+            compare_amount.over(partition_by=yearly.c.loantype).label('prior_amount'),
+            func.sum(yearly.c.total_loan_amount).over(
+                partition_by=yearly.c.loantype,
+                order_by=yearly.c.year
+            ).label('running_amount'),
+            func.max(yearly.c.year).over(partition_by=yearly.c.loantype).label('last_year')
+        ).subquery()
+
+        # One row per loan type: the selected year if present, otherwise its latest earlier year
+        data = db.session.query(windowed).filter(
+            windowed.c.year == windowed.c.last_year
+        ).order_by(windowed.c.loantype).all()
+
+        if not data:
+            return jsonify({"error": f"No Loans/Loan Data not available for year {year}"}), 404
+
+        result = {
+            "year": year,
+            "compareYear": compare_year,
+            "loanTypes": [],
+            "loanCounts": [],
+            "priorLoanCounts": [],
+            "loanAmounts": [],
+            "priorLoanAmounts": [],
+            "runningLoanAmounts": []
+        }
+        for row in data:
+            in_year = int(row.year) == year
+            result["loanTypes"].append(row.loantype)
+            result["loanCounts"].append(row.loan_count if in_year else 0)
+            result["priorLoanCounts"].append(int(row.prior_count or 0))  # SUM(CASE ...) comes back as a numeric
+            result["loanAmounts"].append(to_number(row.total_loan_amount) if in_year else 0)
+            result["priorLoanAmounts"].append(to_number(row.prior_amount))
+            result["runningLoanAmounts"].append(to_number(row.running_amount))
+
+        result["loanCountDelta"], result["loanCountDeltaPct"] = comparison_deltas(result["loanCounts"], result["priorLoanCounts"])
+        result["loanAmountDelta"], result["loanAmountDeltaPct"] = comparison_deltas(result["loanAmounts"], result["priorLoanAmounts"])
+
+        return jsonify(result)
+
+    except Exception as e:
+        print(f"Error in compare-loan-data: {e}")
+        return jsonify({"error": "Failed to fetch loan comparison data"}), 500
+
+
+@app.route('/api/compare-roi-bar-chart-data', methods=['GET'])
+def compare_roi_bar_chart_data():
+    try:
+        country_filter = request.args.get('country', None)
+
+        yearly = db.session.query(
+            Campaign.year,
+            func.sum(Campaign.investment).label('total_investment'),
+            func.sum(Campaign.revenue).label('total_revenue')
+        )
+        if country_filter:
+            yearly = yearly.filter(Campaign.country == country_filter)
+        yearly = yearly.group_by(Campaign.year).subquery()
+
+        # Previous year's figures via LAG, and cumulative totals across years
+        data = db.session.query(
+            yearly.c.year,
+            yearly.c.total_investment,
+            yearly.c.total_revenue,
+            func.lag(yearly.c.year).over(order_by=yearly.c.year).label('prior_year'),
+            func.lag(yearly.c.total_investment).over(order_by=yearly.c.year).label('prior_investment'),
+            func.lag(yearly.c.total_revenue).over(order_by=yearly.c.year).label('prior_revenue'),
+            func.sum(yearly.c.total_investment).over(order_by=yearly.c.year).label('running_investment'),
+            func.sum(yearly.c.total_revenue).over(order_by=yearly.c.year).label('running_revenue')
+        ).order_by(yearly.c.year).all()
+
+        roi_chart_data = []
+        for row in data:
+            investment = to_number(row.total_investment)
+            revenue = to_number(row.total_revenue)
+            # Only compare against the immediately preceding year
+            has_prior = row.prior_year is not None and row.prior_year == row.year - 1
+            roi = round((revenue - investment) / investment * 100, 2) if investment else None
+            # A missing prior period is reported as null rather than as a change from zero
+            prior_investment = prior_revenue = prior_roi = revenue_delta = revenue_delta_pct = None
+            if has_prior:
+                prior_investment = to_number(row.prior_investment)
+                prior_revenue = to_number(row.prior_revenue)
+                prior_roi = round((prior_revenue - prior_investment) / prior_investment * 100, 2) if prior_investment else None
+                [revenue_delta], [revenue_delta_pct] = comparison_deltas([revenue], [prior_revenue])
+
+            roi_chart_data.append({
+                "year": row.year,
+                "total_investment": investment,
+                "total_revenue": revenue,
+                "prior_investment": prior_investment,
+                "prior_revenue": prior_revenue,
+                "revenue_delta": revenue_delta,
+                "revenue_delta_pct": revenue_delta_pct,
+                "roi": roi,
+                "prior_roi": prior_roi,
+                "roi_delta": round(roi - prior_roi, 2) if roi is not None and prior_roi is not None else None,
+                "running_investment": to_number(row.running_investment),
+                "running_revenue": to_number(row.running_revenue)
+            })
+
+        return jsonify(roi_chart_data)
+
+    except Exception as e:
+        print(f"Error in compare-roi-bar-chart-data: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+# Shared cache for third-party feeds: key -> {"data", "etag", "fetched_at", "retry_at", "refreshing"}
+FX_BASE_CURRENCY = "USD"  # Rates are fetched once for this base, other bases are cross-computed
+FX_CACHE_SECONDS = int(os.getenv('FX_CACHE_SECONDS', 3600))
+NEWS_CACHE_SECONDS = int(os.getenv('NEWS_CACHE_SECONDS', 900))
+NEWS_MAX_PAGE = 10  # Bounds upstream calls and the number of cached news pages
+FEED_HTTP_TIMEOUT = (3.05, 10)  # (connect, read) timeouts in seconds
+FEED_RETRY_SECONDS = int(os.getenv('FEED_RETRY_SECONDS', 60))  # Back-off after a failed upstream fetch
+
+feed_session = requests.Session()
+feed_session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+feed_session.mount('http://', HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+feed_cache = {}
+feed_cache_lock = threading.Lock()
+feed_fetch_locks = {}  # key -> lock held while the first copy of a feed is fetched
+feed_failures = {}  # key -> (monotonic time, error) of the last failed cold fetch
+
+
+class FeedError(Exception):
+    pass
+
+
+# GET a feed without letting the URL (which carries the API key) into error messages
+def get_feed(url, log_path, **kwargs):
+    try:
+        response = feed_session.get(url, timeout=FEED_HTTP_TIMEOUT, **kwargs)
+    except requests.RequestException as e:
+        raise FeedError(f"Request to {log_path} failed: {type(e).__name__}")
+    if response.status_code != 200:
+        raise FeedError(f"{log_path} returned {response.status_code}")
+    try:
+        return response.json()
+    except ValueError:
+        raise FeedError(f"{log_path} returned invalid JSON")
+
+
+def store_feed(key, data):
+    body = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    entry = {
+        "data": data,
+        "etag": hashlib.sha1(body.encode('utf-8')).hexdigest(),
+        "fetched_at": time.monotonic(),
+        "retry_at": 0,
+        "refreshing": False
+    }
+    with feed_cache_lock:
+        feed_cache[key] = entry
+        feed_failures.pop(key, None)
+    return entry
+
+
+def refresh_feed(key, fetch):
+    try:
+        store_feed(key, fetch())
+    except Exception as e:
+        # Keep serving the stale copy and hold off before asking the upstream again
+        print(f"Error refreshing feed {key}: {e}")
+        with feed_cache_lock:
+            if key in feed_cache:
+                feed_cache[key]["refreshing"] = False
+                feed_cache[key]["retry_at"] = time.monotonic() + FEED_RETRY_SECONDS
+
+
+# Return the cached feed entry, refreshing it in the background once it goes stale
+def get_cached_feed(key, fetch, max_age):
+    with feed_cache_lock:
+        entry = feed_cache.get(key)
+        now = time.monotonic()
+        if entry and now - entry["fetched_at"] >= max_age and now >= entry["retry_at"] and not entry["refreshing"]:
+            entry["refreshing"] = True
+            threading.Thread(target=refresh_feed, args=(key, fetch), daemon=True).start()
+
+    if entry is None:
+        # Nothing cached yet: one caller fetches, concurrent callers wait for its result
+        with feed_cache_lock:
+            fetch_lock = feed_fetch_locks.setdefault(key, threading.Lock())
+        with fetch_lock:
+            with feed_cache_lock:
+                entry = feed_cache.get(key)
+                failure = feed_failures.get(key)
+            if entry is None:
+                # A recent failure is reused so waiters and retries don't each hit the upstream
+                if failure and time.monotonic() - failure[0] < FEED_RETRY_SECONDS:
+                    raise FeedError(f"{failure[1]} (retrying later)")
+                try:
+                    entry = store_feed(key, fetch())
+                except Exception as e:
+                    with feed_cache_lock:
+                        feed_failures[key] = (time.monotonic(), str(e))
+                    raise
+    return entry
+
+
+def cached_feed_response(entry, max_age):
+    response = jsonify(entry["data"])
+    response.set_etag(entry["etag"])
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+def fetch_fx_rates():
+    data = get_feed(f"{EXCHANGE_API_URL}/{EXCHANGE_API_KEY}/latest/{FX_BASE_CURRENCY}", f"/latest/{FX_BASE_CURRENCY}")
+    if not data.get('conversion_rates'):
+        raise FeedError(f"Unexpected exchange-rate response: {data.get('result')}")
+    return {
+        "conversion_rates": data['conversion_rates'],
+        "time_last_update_utc": data.get('time_last_update_utc')
+    }
+
+
+@app.route('/api/fx-rates', methods=['GET'])
+def get_fx_rates():
+    base = request.args.get('base', FX_BASE_CURRENCY).upper()
+    symbols = request.args.get('symbols')
+
+    try:
+        entry = get_cached_feed('fx-rates', fetch_fx_rates, FX_CACHE_SECONDS)
+    except Exception as e:
+        print(f"Error fetching exchange rates: {e}")
+        return jsonify({"error": "Failed to fetch exchange rates"}), 502
+
+    rates = entry["data"]["conversion_rates"]
+    if base not in rates:
+        return jsonify({"error": f"Unsupported base currency {base}"}), 400
+
+    # Cross rate: 1 base = rates[code] / rates[base] code
+    codes = [c.strip().upper() for c in symbols.split(',')] if symbols else list(rates)
+    conversion_rates = {
+        code: rates[code] / rates[base]
+        for code in codes if code in rates
+    }
+    result = {
+        "base_code": base,
+        "conversion_rates": conversion_rates,
+        "time_last_update_utc": entry["data"]["time_last_update_utc"]
+    }
+    return cached_feed_response({
+        "data": result,
+        "etag": hashlib.sha1(f"{entry['etag']}:{base}:{symbols}".encode('utf-8')).hexdigest()
+    }, FX_CACHE_SECONDS)
+
+
+def fetch_news(page):
+    params = {
+        "api_token": NEWS_API_TOKEN,
+        "symbols": "msft,fb",
+        "limit": 3,
+        "page": page,
+        "language": "en"
+    }
+    data = get_feed(f"{NEWS_API_URL}/news/all", "/news/all", params=params)
+    return {"data": data.get('data', [])}
+
+
+@app.route('/api/news', methods=['GET'])
+def get_news():
+    page = request.args.get('page', 1, type=int)
+    if page < 1 or page > NEWS_MAX_PAGE:
+        return jsonify({"error": f"Page must be between 1 and {NEWS_MAX_PAGE}"}), 400
+
+    try:
+        entry = get_cached_feed(f"news:{page}", lambda: fetch_news(page), NEWS_CACHE_SECONDS)
+    except Exception as e:
+        print(f"Error fetching news: {e}")
+        return jsonify({"error": "Failed to fetch news"}), 502
+
+    return cached_feed_response(entry, NEWS_CACHE_SECONDS)
+
 if __name__ == '__main__':
     app.run(debug=True)
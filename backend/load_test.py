@@ -0,0 +1,317 @@
+"""Replay dashboard sessions against the backend and sweep concurrency levels.
+
+Each simulated analyst logs in, loads the chart list and countries, then hits
+every chart endpoint with random country/year filters and occasionally asks
+for AI insights. For every concurrency level the harness records throughput
+and p50/p99 latency per route, and reports the saturation point.
+
+Usage:
+    # Start a stub model and point the backend at it
+    python load_test.py --stub-model-port 8089
+    HUGGINGFACE_BASE_URL=http://127.0.0.1:8089 python app.py
+
+    # Run the sweep and save a report
+    python load_test.py --levels 1,2,4,8,16,32 --duration 20 --output load_report.json
+
+    # Compare with a saved report; exits with status 1 on regressions or failing routes
+    python load_test.py --output current.json --baseline load_report.json
+"""
+import argparse
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+CHART_ROUTES = [
+    ("/api/get-customer-chart-data", "country"),
+    ("/api/get-pie-chart-data", "country"),
+    ("/api/get-roi-bar-chart-data", "country"),
+    ("/api/get-churn-rate-data", "country"),
+    ("/api/get-transaction-data", "year"),
+    ("/api/get-loan-data", "year"),
+]
+
+
+class StubModelHandler(BaseHTTPRequestHandler):
+    # Answers chat completion calls with a canned response after a fixed delay
+    delay = 0.2
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(self.delay)
+        body = json.dumps({
+            "id": "stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": "stub",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": "Stub insights for load testing."}
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_stub_model(port, delay):
+    StubModelHandler.delay = delay
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubModelHandler)
+    print(f"Stub model listening on http://127.0.0.1:{port} (delay {delay}s)")
+    server.serve_forever()
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.samples = {}  # route -> list of latencies in seconds
+        self.errors = {}  # route -> error count
+
+    def record(self, route, latency, ok):
+        with self.lock:
+            self.samples.setdefault(route, []).append(latency)
+            if not ok:
+                self.errors[route] = self.errors.get(route, 0) + 1
+
+
+# Server errors always count as failures; strict routes also fail on any non-2xx response
+def timed_request(session, recorder, method, base_url, route, strict=False, **kwargs):
+    start = time.perf_counter()
+    try:
+        response = session.request(method, f"{base_url}{route}", timeout=30, **kwargs)
+        ok = response.ok if strict else response.status_code < 500
+    except requests.RequestException:
+        response, ok = None, False
+    recorder.record(route, time.perf_counter() - start, ok)
+    return response
+
+
+# One dashboard session, in the order the frontend issues the requests
+def replay_session(session, recorder, args, countries):
+    response = timed_request(session, recorder, 'POST', args.base_url, '/api/login', strict=True,
+                             json={"email": args.email, "password": args.password})
+    if response is None or not response.ok:
+        # A real analyst would not get past the login page
+        return
+    role = response.json().get('user', {}).get('role', 'Admin')
+
+    timed_request(session, recorder, 'GET', args.base_url, '/api/get-charts', params={"role": role})
+    response = timed_request(session, recorder, 'GET', args.base_url, '/api/get-countries')
+    if not countries and response is not None and response.ok:
+        countries.extend(response.json())
+
+    for route, filter_name in CHART_ROUTES:
+        if filter_name == "year":
+            params = {"year": random.choice(args.years)}
+        else:
+            # The dashboard shows "all countries" as often as a specific one
+            params = {"country": random.choice(countries)} if countries and random.random() < 0.5 else {}
+        timed_request(session, recorder, 'GET', args.base_url, route, params=params)
+
+    if random.random() < args.insights_ratio:
+        timed_request(session, recorder, 'POST', args.base_url, '/generate-insights', json={
+            "country": random.choice(countries) if countries else "all countries",
+            "chart_data": {"sample": [1, 2, 3]},
+            "prompt": "Summarise the chart data."
+        })
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarise(samples, errors, elapsed):
+    values = sorted(samples)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "error_rate": round(errors / len(values), 4) if values else 0,
+        "throughput": round(len(values) / elapsed, 2),
+        "p50_ms": round(percentile(values, 50) * 1000, 2) if values else None,
+        "p99_ms": round(percentile(values, 99) * 1000, 2) if values else None
+    }
+
+
+def run_level(args, concurrency, countries):
+    recorder = Recorder()
+    deadline = time.monotonic() + args.duration
+
+    def worker():
+        # Each analyst keeps one keep-alive connection, like a browser tab
+        with requests.Session() as session:
+            while time.monotonic() < deadline:
+                replay_session(session, recorder, args, countries)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.monotonic() - start
+
+    routes = {
+        route: summarise(samples, recorder.errors.get(route, 0), elapsed)
+        for route, samples in sorted(recorder.samples.items())
+    }
+    all_samples = [latency for samples in recorder.samples.values() for latency in samples]
+    overall = summarise(all_samples, sum(recorder.errors.values()), elapsed)
+    return {"concurrency": concurrency, "duration": round(elapsed, 2), "overall": overall, "routes": routes}
+
+
+# Last level before throughput stops growing or p99 exceeds the limit
+def find_saturation(levels, min_gain, p99_limit_ms):
+    saturation = levels[0]["concurrency"] if levels else None
+    for previous, current in zip(levels, levels[1:]):
+        gain = (current["overall"]["throughput"] - previous["overall"]["throughput"]) / max(previous["overall"]["throughput"], 1e-9)
+        p99 = current["overall"]["p99_ms"]
+        if gain < min_gain or (p99_limit_ms and p99 is not None and p99 > p99_limit_ms):
+            return previous["concurrency"]
+        saturation = current["concurrency"]
+    return saturation
+
+
+# Routes that fail more often than allowed, whether or not there is a baseline
+def check_error_rates(report, max_error_rate):
+    failures = []
+    for level in report["levels"]:
+        for route, stats in level["routes"].items():
+            if stats["error_rate"] > max_error_rate:
+                failures.append(f"c={level['concurrency']} {route}: {stats['errors']} errors "
+                                f"({stats['error_rate']:.2%} > {max_error_rate:.2%})")
+    return failures
+
+
+# Returns (regressions, warnings). Per-route p99 from a few dozen samples is close to the
+# maximum, so p99 is gated on the overall figure with an absolute floor, and routes with
+# too few samples on either side are skipped.
+def compare_reports(current, baseline, args):
+    regressions = []
+    warnings = []
+    tolerance = args.tolerance
+    baseline_levels = {level["concurrency"]: level for level in baseline["levels"]}
+
+    for level in current["levels"]:
+        old_level = baseline_levels.get(level["concurrency"])
+        if not old_level:
+            continue
+        pairs = [("overall", level["overall"], old_level["overall"])]
+        pairs += [(route, stats, old_level["routes"][route])
+                  for route, stats in level["routes"].items() if route in old_level["routes"]]
+
+        for name, new, old in pairs:
+            if min(new["requests"], old["requests"]) < args.min_samples:
+                continue
+            prefix = f"c={level['concurrency']} {name}"
+            if old["throughput"] and new["throughput"] < old["throughput"] * (1 - tolerance):
+                regressions.append(f"{prefix}: throughput {old['throughput']} -> {new['throughput']} req/s")
+            if (name == "overall" and old["p99_ms"] and new["p99_ms"]
+                    and new["p99_ms"] > old["p99_ms"] * (1 + tolerance)
+                    and new["p99_ms"] - old["p99_ms"] > args.p99_floor_ms):
+                regressions.append(f"{prefix}: p99 {old['p99_ms']} -> {new['p99_ms']} ms")
+            # Failing requests are often fast, so errors must be gated on their own
+            old_rate = old.get("error_rate", 0)
+            if new["error_rate"] > old_rate * (1 + tolerance):
+                regressions.append(f"{prefix}: error rate {old_rate:.2%} -> {new['error_rate']:.2%}")
+
+    # The saturation point is a threshold on throughput gain and flips on small changes
+    if baseline.get("saturation") and current["saturation"] is not None and current["saturation"] < baseline["saturation"]:
+        warnings.append(f"saturation point dropped from {baseline['saturation']} to {current['saturation']}")
+    return regressions, warnings
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Dashboard load replay harness")
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--email', default='ayadav1201@gmail.com')
+    parser.add_argument('--password', default='Admin@123')
+    parser.add_argument('--levels', default='1,2,4,8,16,32', help="Comma separated concurrency levels")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds to run each level")
+    parser.add_argument('--years', default='2020,2021,2022,2023,2024')
+    parser.add_argument('--insights-ratio', type=float, default=0.05, help="Share of sessions that request insights")
+    parser.add_argument('--min-gain', type=float, default=0.1, help="Throughput gain below which a level counts as saturated")
+    parser.add_argument('--p99-limit-ms', type=float, default=2000)
+    parser.add_argument('--output', default='load_report.json')
+    parser.add_argument('--baseline', help="Saved report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.15, help="Allowed relative regression against the baseline")
+    parser.add_argument('--p99-floor-ms', type=float, default=25,
+                        help="Overall p99 must also grow by at least this many ms to count as a regression")
+    parser.add_argument('--min-samples', type=int, default=200,
+                        help="Skip baseline comparisons for routes with fewer requests than this")
+    parser.add_argument('--max-error-rate', type=float, default=0.0, help="Highest error rate allowed on any route")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--stub-model-port', type=int, help="Only run a stub model server on this port")
+    parser.add_argument('--stub-model-delay', type=float, default=0.2)
+    args = parser.parse_args()
+    args.years = [int(year) for year in args.years.split(',')]
+    return args
+
+
+def main():
+    args = parse_args()
+    if args.stub_model_port:
+        run_stub_model(args.stub_model_port, args.stub_model_delay)
+        return 0
+
+    random.seed(args.seed)
+    countries = []
+    levels = []
+    for concurrency in [int(level) for level in args.levels.split(',')]:
+        level = run_level(args, concurrency, countries)
+        levels.append(level)
+        overall = level["overall"]
+        print(f"c={concurrency:<4} {overall['throughput']:>8} req/s  p50 {overall['p50_ms']} ms  "
+              f"p99 {overall['p99_ms']} ms  errors {overall['errors']}")
+
+    report = {
+        "base_url": args.base_url,
+        "duration": args.duration,
+        "levels": levels,
+        "saturation": find_saturation(levels, args.min_gain, args.p99_limit_ms)
+    }
+    print(f"Saturation point: {report['saturation']} concurrent analysts")
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report saved to {args.output}")
+
+    status = 0
+    failures = check_error_rates(report, args.max_error_rate)
+    if failures:
+        print("Routes over the error budget:")
+        for failure in failures:
+            print(f"  {failure}")
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions, warnings = compare_reports(report, baseline, args)
+        for warning in warnings:
+            print(f"Warning: {warning}")
+        if regressions:
+            print("Performance regressions:")
+            for regression in regressions:
+                print(f"  {regression}")
+            status = 1
+        else:
+            print("No performance regressions against the baseline.")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
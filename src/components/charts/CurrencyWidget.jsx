@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from "react";
 import { Globe2, ChevronDown, ArrowDown } from "lucide-react";
+import api from "../../services/api";
 
 const CURRENCIES = [
   {
@@ -46,9 +47,6 @@ const CURRENCIES = [
   },
 ];
 
-const API_KEY = import.meta.env.VITE_EXCHANGE_API_KEY;
-const BASE_URL = "https://v6.exchangerate-api.com/v6";
-
 function CurrencyWidget() {
   const [baseCurrency, setBaseCurrency] = useState("USD");
   const [rates, setRates] = useState([]);
@@ -59,10 +57,10 @@ function CurrencyWidget() {
     const fetchRates = async () => {
       try {
         setLoading(true);
-        const response = await fetch(
-          `${BASE_URL}/${API_KEY}/latest/${baseCurrency}`
+        const data = await api.getFxRates(
+          baseCurrency,
+          CURRENCIES.map((c) => c.code)
         );
-        const data = await response.json();
 
         if (data && data.conversion_rates) {
           const newRates = Object.entries(data.conversion_rates)
@@ -1,41 +1,18 @@
 import { useState, useEffect } from "react";
+import api from "../../services/api";
+
+const MAX_NEWS_PAGE = 10; // The backend only serves this many news pages
 
 function NewsComponent() {
   const [news, setNews] = useState([]); // Stores the news data
   const [isLoading, setIsLoading] = useState(false); // Tracks loading state
   const [page, setPage] = useState(1); // Tracks the current page
-  const apiToken = import.meta.env.VITE_NEWS_API_TOKEN; // API token
-  const symbols = "msft,fb"; // Add symbols as needed
-  const limit = 3; // Limit the number of news items to fetch
-  const language = "en"; // Language code (e.g., "en", "es", "fr")
 
   // Function to fetch news
-  const fetchNews = async () => {
+  const fetchNews = async (pageNumber = page) => {
     setIsLoading(true);
     try {
-      const requestOptions = {
-        method: "GET",
-      };
-      const params = {
-        api_token: apiToken,
-        symbols: symbols,
-        limit: limit,
-        page: page,
-        language: language,
-      };
-
-      const query = Object.keys(params)
-        .map(
-          (key) =>
-            `${encodeURIComponent(key)}=${encodeURIComponent(params[key])}`
-        )
-        .join("&");
-
-      const response = await fetch(
-        `https://api.marketaux.com/v1/news/all?${query}`,
-        requestOptions
-      );
-      const result = await response.json();
+      const result = await api.getNews(pageNumber);
 
       // Set news data (ensure data structure matches your component needs)
       if (result && result.data) {
@@ -47,8 +24,6 @@ function NewsComponent() {
           timeAgo: new Date(item.published_at).toLocaleString() || "N/A",
           url: item.url || "#", // URL to the full article
         }));
-        // Save the fetched data to localStorage to prevent re-fetching on refresh
-        localStorage.setItem("news", JSON.stringify(formattedNews));
         setNews(formattedNews); // Update the state with new news data
       } else {
         setNews([]); // No news available
@@ -61,20 +36,16 @@ function NewsComponent() {
     }
   };
 
-  // Check if the news is already in localStorage on component mount
+  // Fetch news on component mount (the backend serves it from a shared cache)
   useEffect(() => {
-    const storedNews = localStorage.getItem("news");
-    if (storedNews) {
-      setNews(JSON.parse(storedNews)); // Use the stored news from localStorage
-    } else {
-      fetchNews(); // Fetch news if not available in localStorage
-    }
+    fetchNews();
   }, []); // Empty dependency array ensures this effect runs only once
 
   // Refresh news on button click
   const refreshNews = () => {
-    setPage(page + 1); // Increment the page number to fetch next set of news
-    fetchNews(); // Fetch new news on refresh button click
+    const nextPage = (page % MAX_NEWS_PAGE) + 1; // Cycle through the available pages
+    setPage(nextPage);
+    fetchNews(nextPage); // Fetch new news on refresh button click
   };
 
   return (
@@ -130,6 +130,55 @@ const api = {
     }
   },
 
+  // Update the role of several users at once
+  bulkUpdateUserRole: async (emails, role) => {
+    try {
+      const response = await axios.put(`${BASE_URL}/users/bulk/role`, {
+        emails,
+        role,
+      });
+      return response.data; // { updated, results: [{ email, status }] }
+    } catch (error) {
+      console.error(
+        "Error bulk updating user roles:",
+        error.response?.data || error.message
+      );
+      throw new Error("Failed to update roles");
+    }
+  },
+
+  // Update the full names of several users at once ([{ email, fullName }])
+  bulkUpdateUserName: async (users) => {
+    try {
+      const response = await axios.put(`${BASE_URL}/users/bulk/name`, {
+        users,
+      });
+      return response.data;
+    } catch (error) {
+      console.error(
+        "Error bulk updating user names:",
+        error.response?.data || error.message
+      );
+      throw new Error("Failed to update user names");
+    }
+  },
+
+  // Delete several users at once (admin users are never deleted)
+  bulkDeleteUsers: async (emails) => {
+    try {
+      const response = await axios.post(`${BASE_URL}/users/bulk/delete`, {
+        emails,
+      });
+      return response.data;
+    } catch (error) {
+      console.error(
+        "Error bulk deleting users:",
+        error.response?.data || error.message
+      );
+      throw new Error("Failed to delete users");
+    }
+  },
+
   getChartsForUser: async (role) => {
     try {
       const response = await fetch(`${BASE_URL}/get-charts?role=${role}`);
@@ -238,6 +287,88 @@ const api = {
     }
   },
 
+  // Year-over-year comparisons (compareYear defaults to the previous year)
+  getTransactionComparisonData: async (year, compareYear = null) => {
+    try {
+      const url = compareYear
+        ? `${BASE_URL}/compare-transaction-data?year=${year}&compare_year=${compareYear}`
+        : `${BASE_URL}/compare-transaction-data?year=${year}`;
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error("Failed to fetch transaction comparison data");
+      }
+      return await response.json();
+    } catch (error) {
+      console.error("Error fetching transaction comparison data:", error);
+      return { error: error.message };
+    }
+  },
+
+  getLoanComparisonData: async (year, compareYear = null) => {
+    try {
+      const url = compareYear
+        ? `${BASE_URL}/compare-loan-data?year=${year}&compare_year=${compareYear}`
+        : `${BASE_URL}/compare-loan-data?year=${year}`;
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error("Failed to fetch loan comparison data");
+      }
+      return await response.json();
+    } catch (error) {
+      console.error("Error fetching loan comparison data:", error);
+      return { error: error.message };
+    }
+  },
+
+  getROIComparisonData: async (country = null) => {
+    try {
+      const url = country
+        ? `${BASE_URL}/compare-roi-bar-chart-data?country=${country}`
+        : `${BASE_URL}/compare-roi-bar-chart-data`;
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error("Failed to fetch ROI comparison data");
+      }
+      return await response.json();
+    } catch (error) {
+      console.error("Error fetching ROI comparison data:", error);
+      return { error: error.message };
+    }
+  },
+
+  // FX rates for a base currency, served from the backend's shared cache
+  getFxRates: async (base, symbols = []) => {
+    try {
+      const url = symbols.length
+        ? `${BASE_URL}/fx-rates?base=${base}&symbols=${symbols.join(",")}`
+        : `${BASE_URL}/fx-rates?base=${base}`;
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error("Failed to fetch exchange rates");
+      }
+      return await response.json();
+    } catch (error) {
+      console.error("Error fetching exchange rates:", error);
+      return { error: error.message };
+    }
+  },
+
+  // Latest news page, served from the backend's shared cache (pages 1-10)
+  getNews: async (page = 1) => {
+    try {
+      const response = await fetch(
+        `${BASE_URL}/news?page=${encodeURIComponent(page)}`
+      );
+      if (!response.ok) {
+        throw new Error("Failed to fetch news");
+      }
+      return await response.json();
+    } catch (error) {
+      console.error("Error fetching news:", error);
+      return { error: error.message };
+    }
+  },
+
   getChurnRateData: async (country = null) => {
     try {
       const url = country